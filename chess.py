@@ -1,54 +1,126 @@
-import re
 from abc import ABC, abstractmethod
-from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 class InvalidMoveError(Exception):
     pass
 
 Position = tuple[int, int]
 
-class Color(Enum):
-    Black = "Black"
-    White = "White"
+# Squares are numbered 0-63 as y * 8 + x, so a 64-bit integer with bit
+# `sq` set represents a set of squares (a bitboard)
+SQUARES: tuple[Position, ...] = tuple((sq % 8, sq // 8) for sq in range(64))
 
-    def opponent(self):
-        return Color.Black if self == Color.White else Color.White
+def square(position: Position) -> int:
+    return position[1] * 8 + position[0]
 
-@dataclass
+def bb_to_squares(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+def bb_to_positions(bb: int) -> list[Position]:
+    return [SQUARES[sq] for sq in bb_to_squares(bb)]
+
+def positions_to_bb(positions) -> int:
+    bb = 0
+    for pos in positions:
+        bb |= 1 << square(pos)
+    return bb
+
+# Colors are plain ints so that comparing them is cheap; they double as
+# the color codes stored in Board.color_at
+WHITE, BLACK = 0, 1
+OPPONENT = (BLACK, WHITE)
+
+# Namespace for the colors, so callers can keep writing Color.White
+class Color:
+    White = WHITE
+    Black = BLACK
+
+# NB: Moves are frozen since parse_move hands out cached instances
+@dataclass(frozen=True, slots=True)
 class Move:
     name: str
     dest: Position
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Castle:
     kingside: bool
 
 
+# Pieces are immutable, so there's only ever one instance per class and
+# color (see Piece.__new__) and pieces can be compared by identity
+_PIECE_INSTANCES: dict[tuple[type, int], "Piece"] = {}
+
 class Piece(ABC):
-    color: Color
+    __slots__ = ("color",)
+    color: int
     name: str
 
-    def __init__(self, color: Color):
-        self.color = color
+    def __new__(cls, color: int):
+        piece = _PIECE_INSTANCES.get((cls, color))
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, "color", color)
+            _PIECE_INSTANCES[(cls, color)] = piece
+        return piece
+
+    # Copying or unpickling goes through __new__, so it returns the
+    # shared instance
+    def __reduce__(self):
+        return type(self), (self.color,)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
-    @abstractmethod
     def possible_moves(self, position, board):
+        if board.get_piece_at(position) is self:
+            return bb_to_positions(board.destinations_at(position))
+        return bb_to_positions(self.destinations(position, board))
+
+    # Bitboard of the squares this piece can move to
+    @abstractmethod
+    def destinations(self, position, board) -> int:
         raise NotImplementedError()
 
-    def __eq__(self, other):
-        if not isinstance(other, Piece):
-            return False
-        return self.color == other.color and self.name == other.name
+    # Bitboard of the squares this piece attacks, regardless of what
+    # occupies them
+    @abstractmethod
+    def attacks(self, position, board) -> int:
+        raise NotImplementedError()
+
+# The moves played so far as a linked list of (previous, (color, move))
+# pairs, newest first. Boards share the history of the board they were
+# created from, so recording a move doesn't copy all the earlier moves.
+# NB: Nested tuples are compared, repr'd and pickled recursively, so long
+# histories must always be walked with a loop instead.
+History = tuple["History", tuple[int, Move]] | None
+
+def history_from(moves) -> History:
+    history = None
+    for entry in moves:
+        history = (history, entry)
+    return history
 
-@dataclass
+@dataclass(slots=True)
 class Board:
-    pieces: dict[Position, Piece]
-    moves: list[tuple[Color, Move]]
+    # One bitboard per piece, at index 8 * color code + kind code
+    bb: list[int]
+    # Piece codes (see PIECE_CODES) and colors per square
+    kind_at: bytearray
+    color_at: bytearray
+    history: History = field(repr=False, compare=False)
+    # Derived from the fields above
+    occ_w: int = field(repr=False, compare=False)
+    occ_b: int = field(repr=False, compare=False)
+    occ: int = field(repr=False, compare=False)
+    _destinations_cache: dict[Position, int] = \
+        field(repr=False, compare=False)
 
     def __init__(self, pieces=None, moves=None):
-        self.moves = moves or []
-        self.pieces: dict[Position, Piece] = pieces or {
+        pieces: dict[Position, Piece] = pieces or {
             (0, 0): Rook(Color.Black),
             (1, 0): Knight(Color.Black),
             (2, 0): Bishop(Color.Black),
@@ -82,6 +154,81 @@ class Board:
             (6, 7): Bishop(Color.White),
             (7, 7): Rook(Color.White),
         }
+        bb = [0] * 16
+        kind_at = bytearray(64)
+        color_at = bytearray(64)
+        for (pos, piece) in pieces.items():
+            sq = square(pos)
+            kind_at[sq] = PIECE_CODES[piece.name]
+            color_at[sq] = piece.color
+            bb[8 * color_at[sq] + kind_at[sq]] |= 1 << sq
+        self._set_state(bb, kind_at, color_at, history_from(moves or []))
+
+    @classmethod
+    def from_state(cls, bb, kind_at, color_at, history):
+        board = cls.__new__(cls)
+        board._set_state(bb, kind_at, color_at, history)
+        return board
+
+    def _set_state(self, bb, kind_at, color_at, history):
+        self.bb = bb
+        self.kind_at = kind_at
+        self.color_at = color_at
+        self.history = history
+        self.occ_w = 0
+        self.occ_b = 0
+        for kind in range(1, 7):
+            self.occ_w |= bb[kind]
+            self.occ_b |= bb[8 + kind]
+        self.occ = self.occ_w | self.occ_b
+        # Boards are never mutated (moves return a new board), so the
+        # cache never needs to be invalidated
+        self._destinations_cache = {}
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        if (self.bb, self.kind_at, self.color_at) != \
+                (other.bb, other.kind_at, other.color_at):
+            return False
+        a, b = self.history, other.history
+        while a is not b:
+            if a is None or b is None:
+                return False
+            (a, entry_a), (b, entry_b) = a, b
+            if entry_a != entry_b:
+                return False
+        return True
+
+    def __getstate__(self):
+        return self.bb, self.kind_at, self.color_at, self.moves
+
+    def __setstate__(self, state):
+        bb, kind_at, color_at, moves = state
+        self._set_state(bb, kind_at, color_at, history_from(moves))
+
+    @property
+    def moves(self) -> list[tuple[int, Move]]:
+        moves = []
+        node = self.history
+        while node:
+            node, entry = node
+            moves.append(entry)
+        moves.reverse()
+        return moves
+
+    def occupancy(self, color):
+        return self.occ_w if color == WHITE else self.occ_b
+
+    # Bitboard of the squares the piece at `position` can move to, computed
+    # once per board (0 for an empty square)
+    def destinations_at(self, position):
+        dests = self._destinations_cache.get(position)
+        if dests is None:
+            piece = self.get_piece_at(position)
+            dests = piece.destinations(position, self) if piece else 0
+            self._destinations_cache[position] = dests
+        return dests
 
     def __str__(self):
         rows = []
@@ -90,7 +237,7 @@ class Board:
             for x in range(8):
                 if piece := self.get_piece_at((x, y)):
                     name = piece.name
-                    if piece.color == Color.White:
+                    if piece.color == WHITE:
                         name = name.lower()
                     row.append(name)
                 else:
@@ -105,30 +252,46 @@ class Board:
 #                 if c == ""
 
     def get_piece_at(self, position: Position):
-        return self.pieces.get(position)
+        if is_out_of_bounds(position):
+            return None
+        sq = square(position)
+        return _PIECE_POOL[self.color_at[sq]][self.kind_at[sq]]
 
     def is_blocked(self, color, position):
-        if piece := self.get_piece_at(position):
-            if piece.color == color:
-                return True
-        return False
-
+        if is_out_of_bounds(position):
+            return False
+        return bool(self.occupancy(color) & (1 << square(position)))
+
+    # NB: Instead of generating the attacks of every piece of `color`, we
+    # look outwards from `position`: e.g. it's attacked by a knight if a
+    # knight standing on it would attack one of the knights of `color`.
+    # This is also why boards don't keep per-color attack maps: a query
+    # costs a few lookups, whereas a map would have to be rebuilt or
+    # patched for every move whether or not anything asks for it.
     def is_attacked_by(self, color, position):
-        for (pos, piece) in self.pieces.items():
-            if piece.color == color:
-                if position in piece.possible_moves(pos, self):
-                    return True
-        return False
+        sq = square(position)
+        bb = self.bb
+        base = 8 * color
+        if KNIGHT_ATTACK_BBS[sq] & bb[base + KNIGHT]:
+            return True
+        if KING_ATTACK_BBS[sq] & bb[base + KING]:
+            return True
+        if PAWN_CAPTURES[OPPONENT[color]][sq] & bb[base + PAWN]:
+            return True
+        queens = bb[base + QUEEN]
+        if bishop_attacks(sq, self.occ) & (bb[base + BISHOP] | queens):
+            return True
+        return bool(rook_attacks(sq, self.occ) & (bb[base + ROOK] | queens))
 
     def can_castle(self, color, kingside) -> bool:
-        rank = 0 if color.Black else 7
+        rank = 0 if color == BLACK else 7
         free_files = [5, 6] if kingside else [1, 2, 3]
         for file in free_files:
             if self.get_piece_at((file, rank)):
                 return False
         not_attacked_files = [4, 5, 6, 7] if kingside else [0, 1, 2, 3, 4]
         for file in not_attacked_files:
-            if self.is_attacked_by(color.opponent(), (file, rank)):
+            if self.is_attacked_by(OPPONENT[color], (file, rank)):
                 return False
         # NOTE: We check whether castling is possible by checking if
         # neither king nor rook has moved. Since there are two rooks,
@@ -136,55 +299,83 @@ class Board:
         # if the rook is in its original position *and* that no piece
         # has moved *to* that position.
         original_rook_position = (7 if kingside else 0, rank)
-        if self.get_piece_at(original_rook_position) != Rook(Color.Black):
+        rook_sq = square(original_rook_position)
+        if self.kind_at[rook_sq] != ROOK or self.color_at[rook_sq] != color:
+            return False
+        king_sq = square((4, rank))
+        if self.kind_at[king_sq] != KING or self.color_at[king_sq] != color:
             return False
-        for color, move in self.moves:
-            if color == color:
-                if move.name == "K":
+        node = self.history
+        while node:
+            node, (c, move) = node
+            if c == color:
+                if isinstance(move, Castle) or move.name == "K":
                     return False
                 if move.dest == original_rook_position:
                     return False
         return True
 
-    @classmethod
-    def move_piece(cls, pieces, src, dest):
-        updated_pieces = dict(pieces)
-        updated_pieces[dest] = updated_pieces.pop(src)
-        return updated_pieces
+    def copy_state(self):
+        return list(self.bb), bytearray(self.kind_at), bytearray(self.color_at)
 
-    def castle(self, color: Color, move: Castle):
+    # NB: Updates the given state in place; use `copy_state` first
+    @classmethod
+    def move_piece(cls, bb, kind_at, color_at, src, dest):
+        src_sq = square(src)
+        dest_sq = square(dest)
+        if captured := kind_at[dest_sq]:
+            bb[8 * color_at[dest_sq] + captured] ^= 1 << dest_sq
+        moved = 8 * color_at[src_sq] + kind_at[src_sq]
+        bb[moved] ^= (1 << src_sq) | (1 << dest_sq)
+        kind_at[dest_sq] = kind_at[src_sq]
+        color_at[dest_sq] = color_at[src_sq]
+        kind_at[src_sq] = 0
+        color_at[src_sq] = 0
+
+    def castle(self, color: int, move: Castle):
         kingside = move.kingside
         if not self.can_castle(color, kingside):
             raise InvalidMoveError("Can't castle from this position")
-        rank = 0 if color.Black else 7
+        rank = 0 if color == BLACK else 7
         original_rook_position = (7 if kingside else 0, rank)
         original_king_position = (4, rank)
         new_rook_position = (5 if kingside else 3, rank)
         new_king_position = (6 if kingside else 2, rank)
-        pieces = Board.move_piece(self.pieces, original_king_position, new_king_position)
-        pieces = Board.move_piece(pieces, original_rook_position, new_rook_position)
-        return Board(pieces=pieces, moves=self.moves + [(color, move)])
+        state = self.copy_state()
+        Board.move_piece(*state, original_king_position, new_king_position)
+        Board.move_piece(*state, original_rook_position, new_rook_position)
+        return Board.from_state(*state, (self.history, (color, move)))
 
     # TODO: Move disambiguation
-    def move(self, color: Color, move: str):
+    def move(self, color: int, move: str):
         m = parse_move(move)
         if isinstance(m, Castle):
             return self.castle(color, m)
-        matching_positions: list[Position] = []
-        for (pos, piece) in self.pieces.items():
-            if piece.color == color and piece.name == m.name:
-                if m.dest in piece.possible_moves(pos, self):
-                    matching_positions.append(pos)
-        if not matching_positions:
+        kind = PIECE_CODES[m.name]
+        dest_sq = square(m.dest)
+        candidates = self.bb[8 * color + kind]
+        sources = 0
+        if kind == PAWN:
+            for sq in bb_to_squares(candidates):
+                if self.destinations_at(SQUARES[sq]) >> dest_sq & 1:
+                    sources |= 1 << sq
+        elif not self.occupancy(color) >> dest_sq & 1:
+            # NB: Apart from pawns, pieces move the same way in both
+            # directions, so the pieces that can move to `dest` are the
+            # ones a piece of the same kind standing on `dest` attacks
+            piece = _PIECE_POOL[color][kind]
+            sources = piece.attacks(m.dest, self) & candidates
+        if not sources:
             raise InvalidMoveError("No matching piece found")
-        if not len(matching_positions) == 1:
+        if sources & (sources - 1):
             raise InvalidMoveError("Ambiguous move")
-        [pos] = matching_positions
-        pieces = Board.move_piece(self.pieces, pos, m.dest)
-        return Board(pieces=pieces, moves=self.moves + [(color, m)])
+        state = self.copy_state()
+        Board.move_piece(*state, SQUARES[sources.bit_length() - 1], m.dest)
+        return Board.from_state(*state, (self.history, (color, m)))
 
 
 class Pawn(Piece):
+    __slots__ = ()
     name = "P"
 
     # TODO: En passant captures
@@ -193,29 +384,26 @@ class Pawn(Piece):
     # NB: Whether a pawn has moved can be determined by checking if
     # it's still in its starting rank
     def has_moved(self, position):
-        if self.color == Color.Black and position[1] == 1:
+        if self.color == BLACK and position[1] == 1:
             return False
         elif position[1] == 6:
             return False
         return True
 
-    def possible_moves(self, position, board):
-        direction = 1 if self.color == Color.Black else -1
-        moves = []
-        x, y = position[0], position[1]
-        if not board.get_piece_at((x, y + direction)):
-            moves.append((x, y + direction))
-            if not self.has_moved(position):
-                moves.append((x, y + direction * 2))
-        capture_moves = [
-            (x + direction, y + direction),
-            (x - direction, y + direction),
-        ]
-        for m in capture_moves:
-            if piece := board.get_piece_at(m):
-                if piece.color != self.color:
-                    moves.append(m)
-        return moves
+    def destinations(self, position, board):
+        sq = square(position)
+        dests = 0
+        push = PAWN_PUSHES[self.color][sq]
+        if not board.occ & push:
+            dests = push
+            double_push = PAWN_DOUBLE_PUSHES[self.color][sq]
+            if not board.occ & double_push:
+                dests |= double_push
+        enemies = board.occupancy(OPPONENT[self.color])
+        return dests | PAWN_CAPTURES[self.color][sq] & enemies
+
+    def attacks(self, position, board):
+        return PAWN_CAPTURES[self.color][square(position)]
 
 straight_moves = [
     lambda i: (+i, 0),
@@ -231,26 +419,19 @@ diagonal_moves = [
     lambda i: (-i, -i),
 ]
 
-def filter_moves(position, color, direction_fns, board):
-    moves = []
-    for df in direction_fns:
-        for d in map(df, range(8)):
-            pos = position[0] + d[0], position[1] + d[1]
-            if pos == position or is_out_of_bounds(pos):
-                continue
-            if piece := board.get_piece_at(pos):
-                if piece.color != color:
-                    moves.append(pos)
-                break
-            else:
-                moves.append(pos)
-    return moves
+def filter_moves(position, color, attack_fns, board):
+    sq = square(position)
+    attacks = 0
+    for fn in attack_fns:
+        attacks |= fn(sq, board.occ)
+    return attacks & ~board.occupancy(color)
 
 class Rook(Piece):
+    __slots__ = ()
     name = "R"
 
-    def possible_moves(self, position, board):
-        return filter_moves(position, self.color, straight_moves, board)
+    def destinations(self, position, board):
+        return filter_moves(position, self.color, (rook_attacks,), board)
         # x, y = position[0], position[1]
         # directions = [
         #     [(x + i, y) for i in range(x, 8)],
@@ -271,78 +452,225 @@ class Rook(Piece):
         #             moves.append(pos)
         # return moves
 
+    def attacks(self, position, board):
+        return rook_attacks(square(position), board.occ)
+
+# NB: Any coordinate outside 0-7 has a bit set outside the lowest three
+# (negative numbers have all their high bits set), so one mask covers
+# both coordinates and both bounds
 def is_out_of_bounds(position: Position):
-    for i in range(2):
-        if not 0 <= position[i] < 8:
-            return True
-    return False
+    x, y = position
+    return (x | y) & -8 != 0
+
+
+KNIGHT_DELTAS = [
+    (-1, -2),
+    (+1, -2),
+    (+2, -1),
+    (+2, +1),
+    (+1, +2),
+    (-1, +2),
+    (-2, -1),
+    (-2, +1),
+]
 
+KING_DELTAS = [fn(1) for fn in straight_moves + diagonal_moves]
+
+ALL_SQUARES = (1 << 64) - 1
+
+# For each file offset, the squares a bitboard can be shifted onto by
+# that many files without wrapping around to the other side of the board
+SHIFT_MASKS = {
+    dx: positions_to_bb(pos for pos in SQUARES if 0 <= pos[0] - dx < 8)
+    for dx in range(-2, 3)
+}
+
+def shift(bb: int, dx: int, dy: int) -> int:
+    offset = dy * 8 + dx
+    bb = bb << offset if offset >= 0 else bb >> -offset
+    return bb & SHIFT_MASKS[dx] & ALL_SQUARES
+
+# These work on every piece in `bb` at once, with one shift per delta
+def knight_attacks(bb: int) -> int:
+    attacked = 0
+    for (dx, dy) in KNIGHT_DELTAS:
+        attacked |= shift(bb, dx, dy)
+    return attacked
+
+def king_attacks(bb: int) -> int:
+    attacked = 0
+    for (dx, dy) in KING_DELTAS:
+        attacked |= shift(bb, dx, dy)
+    return attacked
+
+KNIGHT_ATTACK_BBS = tuple(knight_attacks(1 << sq) for sq in range(64))
+KING_ATTACK_BBS = tuple(king_attacks(1 << sq) for sq in range(64))
+
+def on_board_bb(positions) -> int:
+    return positions_to_bb(p for p in positions if not is_out_of_bounds(p))
+
+# Pawn push, double push and capture squares for each square
+def pawn_tables(color):
+    pawn = Pawn(color)
+    direction = 1 if color == BLACK else -1
+    pushes, double_pushes, captures = [], [], []
+    for (x, y) in SQUARES:
+        pushes.append(on_board_bb([(x, y + direction)]))
+        double_pushes.append(
+            0 if pawn.has_moved((x, y))
+            else on_board_bb([(x, y + 2 * direction)])
+        )
+        captures.append(on_board_bb([
+            (x - 1, y + direction),
+            (x + 1, y + direction),
+        ]))
+    return tuple(pushes), tuple(double_pushes), tuple(captures)
+
+# Indexed by color, then square
+PAWN_PUSHES, PAWN_DOUBLE_PUSHES, PAWN_CAPTURES = zip(
+    pawn_tables(WHITE), pawn_tables(BLACK)
+)
+
+# For each square, one ray per direction function, ordered outwards from
+# the square and stopping at the edge of the board
+def ray_table(direction_fns):
+    table = []
+    for (x, y) in SQUARES:
+        rays = []
+        for df in direction_fns:
+            ray = []
+            for (dx, dy) in map(df, range(1, 8)):
+                pos = (x + dx, y + dy)
+                if is_out_of_bounds(pos):
+                    break
+                ray.append(pos)
+            rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+STRAIGHT_RAYS = ray_table(straight_moves)
+DIAGONAL_RAYS = ray_table(diagonal_moves)
+
+# For each direction, whether its rays run towards higher square numbers
+# and the ray's bitboard from every square
+def ray_masks(ray_table, direction_fns):
+    directions = []
+    for (i, df) in enumerate(direction_fns):
+        dx, dy = df(1)
+        masks = tuple(positions_to_bb(rays[i]) for rays in ray_table)
+        directions.append((dy * 8 + dx > 0, masks))
+    return tuple(directions)
+
+STRAIGHT_DIRECTIONS = ray_masks(STRAIGHT_RAYS, straight_moves)
+DIAGONAL_DIRECTIONS = ray_masks(DIAGONAL_RAYS, diagonal_moves)
+
+# NB: Only the first blocker along a ray matters; it's the lowest set bit
+# of the occupied ray squares if the ray runs towards higher squares, and
+# the highest otherwise. Removing the blocker's own ray in the same
+# direction leaves the squares up to and including the blocker.
+def slider_attacks(directions, sq: int, occ: int) -> int:
+    attacked = 0
+    for (ascending, masks) in directions:
+        ray = masks[sq]
+        if blockers := ray & occ:
+            if ascending:
+                blockers &= -blockers
+            ray ^= masks[blockers.bit_length() - 1]
+        attacked |= ray
+    return attacked
+
+def rook_attacks(sq: int, occ: int) -> int:
+    return slider_attacks(STRAIGHT_DIRECTIONS, sq, occ)
+
+def bishop_attacks(sq: int, occ: int) -> int:
+    return slider_attacks(DIAGONAL_DIRECTIONS, sq, occ)
 
 class Knight(Piece):
+    __slots__ = ()
     name = "N"
 
-    def possible_moves(self, position, board):
-        x, y = position[0], position[1]
-        all_moves = [
-            (x - 1, y - 2),
-            (x + 1, y - 2),
-            (x + 2, y - 1),
-            (x + 2, y + 1),
-            (x + 1, y + 2),
-            (x - 1, y + 2),
-            (x - 2, y - 1),
-            (x - 2, y + 1),
-        ]
-        moves = []
-        for m in all_moves:
-            if not is_out_of_bounds(m) and not board.is_blocked(self.color, m):
-                moves.append(m)
-        return moves
+    def destinations(self, position, board):
+        sq = square(position)
+        return KNIGHT_ATTACK_BBS[sq] & ~board.occupancy(self.color)
+
+    def attacks(self, position, board):
+        return KNIGHT_ATTACK_BBS[square(position)]
 
 
 class Bishop(Piece):
+    __slots__ = ()
     name = "B"
 
-    def possible_moves(self, position, board):
-        return filter_moves(position, self.color, diagonal_moves, board)
+    def destinations(self, position, board):
+        return filter_moves(position, self.color, (bishop_attacks,), board)
+
+    def attacks(self, position, board):
+        return bishop_attacks(square(position), board.occ)
 
 
 class King(Piece):
+    __slots__ = ()
     name = "K"
 
-    def possible_moves(self, position, board):
-        x, y = position[0], position[1]
-        moves = []
-        for fn in straight_moves + diagonal_moves:
-            dx, dy = fn(1)
-            m = (x + dx, y + dy)
-            if not is_out_of_bounds(m) and not board.is_blocked(self.color, m):
-                moves.append(m)
-        return moves
+    def destinations(self, position, board):
+        sq = square(position)
+        return KING_ATTACK_BBS[sq] & ~board.occupancy(self.color)
+
+    def attacks(self, position, board):
+        return KING_ATTACK_BBS[square(position)]
 
 
 class Queen(Piece):
+    __slots__ = ()
     name = "Q"
 
-    def possible_moves(self, position, board):
-        move_fns = diagonal_moves + straight_moves
-        return filter_moves(position, self.color, move_fns, board)
+    def destinations(self, position, board):
+        attack_fns = (bishop_attacks, rook_attacks)
+        return filter_moves(position, self.color, attack_fns, board)
+
+    def attacks(self, position, board):
+        sq = square(position)
+        return bishop_attacks(sq, board.occ) | rook_attacks(sq, board.occ)
+
+
+PIECE_CLASSES = {
+    cls.name: cls for cls in (Pawn, Knight, Bishop, Rook, Queen, King)
+}
+
+# Integer codes stored in Board.kind_at. A kind of 0 is an empty square,
+# in which case Board.color_at is meaningless.
+PIECE_NAMES = " " + "".join(PIECE_CLASSES)
+PIECE_CODES = {name: code for code, name in enumerate(PIECE_NAMES) if code}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = map(PIECE_CODES.get, "PNBRQK")
+
+# One shared piece per (color, kind code), with None for empty squares,
+# so looking up a piece doesn't allocate
+_PIECE_POOL = tuple(
+    tuple(PIECE_CLASSES[name](color) if name != " " else None
+          for name in PIECE_NAMES)
+    for color in (WHITE, BLACK)
+)
 
 
 # TODO: Disambiguating moves
 # TODO: Promotion
 # TODO: Castling
+@lru_cache(maxsize=1024)
 def parse_move(move: str):
     if move == "0-0" or move == "0-0-0":
         return Castle(kingside=move == "0-0")
-    piece = "Q|R|N|B|K"
-    files = "87654321"
-    ranks = "abcdefgh"
-    match = re.match("(" + piece + "?)x?([a-h])([1-8])", move)
-    if not match:
+    i = 0
+    name = "P"
+    if move[:1] and move[0] in "QRNBK":
+        name = move[0]
+        i += 1
+    if move[i:i + 1] == "x":
+        i += 1
+    if len(move) < i + 2 or move[i] not in "abcdefgh" \
+            or move[i + 1] not in "12345678":
         raise InvalidMoveError(f"Invalid move: {move}")
     dest = (
-        ranks.index(match.group(2)),
-        files.index(match.group(3)),
+        ord(move[i]) - ord("a"),
+        ord("8") - ord(move[i + 1]),
     )
-    return Move(name=match.group(1) or "P", dest=dest)
+    return Move(name=name, dest=dest)
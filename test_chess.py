@@ -1,10 +1,95 @@
+import copy
+import pickle
+
 import pytest
 
 from chess import (
-    Board, Bishop, Color, Pawn, Rook, King, Knight, InvalidMoveError
+    Board, Bishop, Castle, Color, Move, Pawn, Rook, King, Knight, Queen,
+    OPPONENT, InvalidMoveError, is_out_of_bounds, knight_attacks, parse_move,
+    positions_to_bb
 )
 
 
+@pytest.mark.parametrize("move, expected", [
+    ("e4", Move("P", (4, 4))),
+    ("Nf3", Move("N", (5, 5))),
+    ("Qxh8", Move("Q", (7, 0))),
+    ("Ra1+", Move("R", (0, 7))),
+    ("0-0", Castle(kingside=True)),
+    ("0-0-0", Castle(kingside=False)),
+])
+def test_parse_move(move, expected):
+    assert parse_move(move) == expected
+
+
+def test_parse_move_is_cached():
+    assert parse_move("Nf3") is parse_move("Nf3")
+
+
+@pytest.mark.parametrize("move", ["", "N", "Nx", "i4", "e9", "Pe4", "e"])
+def test_parse_invalid_move(move):
+    with pytest.raises(InvalidMoveError):
+        parse_move(move)
+
+
+@pytest.mark.parametrize("position, expected", [
+    ((0, 0), False),
+    ((7, 7), False),
+    ((3, 5), False),
+    ((-1, 0), True),
+    ((0, -1), True),
+    ((8, 0), True),
+    ((0, 8), True),
+    ((-9, 20), True),
+])
+def test_is_out_of_bounds(position, expected):
+    assert is_out_of_bounds(position) == expected
+
+
+def test_pieces_are_shared():
+    assert Pawn(Color.White) is Pawn(Color.White)
+    assert Pawn(Color.White) is not Pawn(Color.Black)
+    assert Rook(Color.Black) is not King(Color.Black)
+    assert Board().get_piece_at((0, 0)) is Rook(Color.Black)
+
+
+@pytest.mark.parametrize("position, expected", [
+    ((1, 6), True),
+    ((1, 5), False),
+    ((-1, 0), False),
+    ((8, 6), False),
+    ((0, 8), False),
+])
+def test_is_blocked(position, expected):
+    assert Board().is_blocked(Color.White, position) == expected
+
+
+def test_copied_pieces_are_shared():
+    piece = Rook(Color.Black)
+    assert copy.copy(piece) is piece
+    assert copy.deepcopy({(0, 0): piece})[(0, 0)] is piece
+    assert pickle.loads(pickle.dumps(piece)) is piece
+
+
+@pytest.mark.parametrize("cls", [Pawn, Knight, Bishop, Rook, Queen, King])
+@pytest.mark.parametrize("color", [Color.White, Color.Black])
+def test_unpickled_pieces_compare_equal(cls, color):
+    board = Board({(3, 3): cls(color)})
+    board = pickle.loads(pickle.dumps(board))
+    assert board.get_piece_at((3, 3)) is cls(color)
+    assert board.get_piece_at((3, 3)) == cls(color)
+    unpickled = pickle.loads(pickle.dumps(cls(color)))
+    assert unpickled is cls(color)
+    assert unpickled == cls(color)
+    assert unpickled != cls(OPPONENT[color])
+
+
+def test_pieces_are_immutable():
+    with pytest.raises(AttributeError):
+        Pawn(Color.White).color = Color.Black
+    assert Pawn(Color.White).color == Color.White
+
+
 def test_black_pawn_moves():
     piece = Pawn(Color.Black)
     board = Board({
@@ -37,6 +122,27 @@ def test_blocked_pawn(color):
     assert [] == piece.possible_moves((3, 1), board)
 
 
+def test_pawn_double_push_blocked():
+    piece = Pawn(Color.White)
+    board = Board({
+        (3, 6): piece,
+        (3, 4): Pawn(Color.Black),
+    })
+    assert [(3, 5)] == piece.possible_moves((3, 6), board)
+
+
+@pytest.mark.parametrize("position", [(0, 6), (7, 6)])
+def test_pawn_captures_on_edge(position):
+    piece = Pawn(Color.White)
+    board = Board({
+        position: piece,
+        (1, 5): Pawn(Color.Black),
+        (6, 5): Pawn(Color.Black),
+    })
+    moves = piece.possible_moves(position, board)
+    assert len(moves) == 3
+
+
 # TODO: Parametrize
 def test_move_pawn():
     board = Board({(2, 6): Pawn(Color.White)})
@@ -52,6 +158,30 @@ def test_record_moves():
     assert len(board.moves) == move_len + 1
 
 
+def test_move_history():
+    board = Board({(0, 0): Rook(Color.Black), (2, 6): Pawn(Color.White)})
+    after = board.move(Color.White, "c3").move(Color.Black, "Rb8")
+    assert after.moves == [
+        (Color.White, Move("P", (2, 5))),
+        (Color.Black, Move("R", (1, 0))),
+    ]
+    assert board.moves == []
+    replayed = Board({(1, 0): Rook(Color.Black)}, moves=after.moves)
+    assert replayed.moves == after.moves
+
+
+def test_long_move_history():
+    board = Board({(0, 0): Rook(Color.Black)})
+    for i in range(1500):
+        board = board.move(Color.Black, "Rb8" if i % 2 == 0 else "Ra8")
+    replayed = Board({(0, 0): Rook(Color.Black)}, moves=board.moves)
+    assert len(board.moves) == 1500
+    assert board == replayed
+    assert board != Board({(0, 0): Rook(Color.Black)})
+    assert "Board(" in repr(board)
+    assert pickle.loads(pickle.dumps(board)) == board
+
+
 def test_move_rook():
     board = Board({(0, 0): Rook(Color.Black)})
     board = board.move(Color.Black, "Re8")
@@ -81,6 +211,20 @@ def test_rook_capture():
     assert board.get_piece_at((0, 6)) == Rook(Color.Black)
 
 
+def test_capture_updates_board_state():
+    board = Board({
+        (0, 0): Rook(Color.Black),
+        (0, 6): Pawn(Color.White),
+    })
+    board = board.move(Color.Black, "Ra2")
+    rook_bb = positions_to_bb([(0, 6)])
+    assert board.occupancy(Color.White) == 0
+    assert board.occupancy(Color.Black) == rook_bb
+    assert board.occ == rook_bb
+    assert board.bb == Board({(0, 6): Rook(Color.Black)}).bb
+    assert board.kind_at[0] == 0
+
+
 @pytest.mark.parametrize("start, move", [
     ((1, 0), "Na6"),
     ((1, 0), "Nc6"),
@@ -98,6 +242,35 @@ def test_knight_move(start, move):
     board.move(Color.Black, move)
 
 
+def test_destinations_at():
+    board = Board({
+        (1, 0): Knight(Color.Black),
+        (3, 1): Pawn(Color.Black),
+    })
+    expected = positions_to_bb([(0, 2), (2, 2)])
+    assert board.destinations_at((1, 0)) == expected
+    assert board.destinations_at((1, 0)) == expected
+    assert board.destinations_at((4, 4)) == 0
+
+
+def test_knight_attacks_of_several_knights():
+    knights = positions_to_bb([(0, 0), (7, 7)])
+    expected = positions_to_bb([(1, 2), (2, 1), (6, 5), (5, 6)])
+    assert knight_attacks(knights) == expected
+
+
+def test_ambiguous_move():
+    board = Board({
+        (0, 0): Rook(Color.Black),
+        (7, 0): Rook(Color.Black),
+    })
+    with pytest.raises(InvalidMoveError):
+        board.move(Color.Black, "Re8")
+    board = board.move(Color.Black, "Ra1")
+    assert board.get_piece_at((0, 7)) == Rook(Color.Black)
+    assert board.get_piece_at((0, 0)) is None
+
+
 def test_blocked_knight():
     board = Board({
         (1, 0): Knight(Color.Black),
@@ -108,6 +281,17 @@ def test_blocked_knight():
         board.move(Color.Black, "Nd7")
 
 
+def test_king_moves_in_corner():
+    piece = King(Color.Black)
+    board = Board({
+        (0, 0): piece,
+        (1, 0): Pawn(Color.Black),
+        (0, 1): Pawn(Color.White),
+    })
+    moves = piece.possible_moves((0, 0), board)
+    assert set(moves) == {(0, 1), (1, 1)}
+
+
 @pytest.mark.parametrize("start, move", [
     ((2, 2), "Ba8"),
     ((2, 2), "Bd5"),
@@ -117,6 +301,18 @@ def test_bishop(start, move):
     board.move(Color.Black, move)
 
 
+def test_queen_moves():
+    piece = Queen(Color.White)
+    board = Board({
+        (0, 0): piece,
+        (2, 0): Pawn(Color.White),
+        (0, 1): Pawn(Color.Black),
+        (1, 1): Pawn(Color.Black),
+    })
+    moves = piece.possible_moves((0, 0), board)
+    assert set(moves) == {(1, 0), (0, 1), (1, 1)}
+
+
 def test_castling():
     board = Board({
         (0, 0): Rook(Color.Black),
@@ -131,6 +327,52 @@ def test_castling():
     assert kingside.get_piece_at((5, 0)) == Rook(Color.Black)
 
 
+def test_white_castling():
+    board = Board({
+        (0, 7): Rook(Color.White),
+        (4, 7): King(Color.White),
+        (7, 7): Rook(Color.White),
+    })
+    queenside = board.move(Color.White, "0-0-0")
+    assert queenside.get_piece_at((2, 7)) == King(Color.White)
+    assert queenside.get_piece_at((3, 7)) == Rook(Color.White)
+    kingside = board.move(Color.White, "0-0")
+    assert kingside.get_piece_at((6, 7)) == King(Color.White)
+    assert kingside.get_piece_at((5, 7)) == Rook(Color.White)
+
+
+def test_castling_ignores_opponent_moves():
+    board = Board({
+        (0, 0): Rook(Color.Black),
+        (4, 0): King(Color.Black),
+        (4, 7): King(Color.White),
+    })
+    board = board.move(Color.White, "Kd1").move(Color.Black, "0-0-0")
+    assert board.get_piece_at((2, 0)) == King(Color.Black)
+
+
+def test_castling_only_once():
+    board = Board({
+        (0, 0): Rook(Color.Black),
+        (4, 0): King(Color.Black),
+        (7, 0): Rook(Color.Black),
+    })
+    board = board.move(Color.Black, "0-0")
+    with pytest.raises(InvalidMoveError):
+        board.move(Color.Black, "0-0-0")
+
+
+@pytest.mark.parametrize("pieces", [
+    {(0, 0): Rook(Color.Black)},
+    {(0, 0): Rook(Color.Black), (4, 0): King(Color.White)},
+    {(0, 0): Rook(Color.Black), (4, 0): Knight(Color.Black)},
+])
+def test_castling_without_king(pieces):
+    board = Board(pieces)
+    with pytest.raises(InvalidMoveError):
+        board.move(Color.Black, "0-0-0")
+
+
 def test_castling_not_available():
     board = Board({
         (0, 0): Rook(Color.Black),
@@ -161,6 +403,15 @@ def test_castling_blocked_by_attack(position):
     with pytest.raises(InvalidMoveError):
         board.move(Color.Black, "0-0-0")
 
+def test_castling_blocked_by_pawn_attack():
+    board = Board({
+        (0, 0): Rook(Color.Black),
+        (4, 0): King(Color.Black),
+        (2, 1): Pawn(Color.White),
+    })
+    with pytest.raises(InvalidMoveError):
+        board.move(Color.Black, "0-0-0")
+
 @pytest.mark.parametrize("position", [(5, 7), (6, 7), (7, 7)])
 def test_castling_not_blocked_by_attack(position):
     board = Board({